@@ -2,13 +2,39 @@
 Tic Tac Toe Player
 """
 
+import functools
 import math
-import copy
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Boards are searched as a pair of bitboards (x_mask, o_mask), where bit i is set if
+# the player has taken cell (i // 3, i % 3)
+FULL_BOARD = 0o777
+WIN_PATTERNS = (
+    0o007, 0o070, 0o700,  # Rows
+    0o111, 0o222, 0o444,  # Columns
+    0o421, 0o124          # Diagonals
+)
+
+# Order cells are tried in by the search: the centre, then corners, then edges (stronger moves
+# first lets alpha-beta pruning cut off more of the game tree)
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+# Kinds of value stored in the transposition table: the position's exact value, or only a
+# lower or upper bound on it (when alpha-beta pruning cut the search short)
+EXACT = "exact"
+LOWER_BOUND = "lower"
+UPPER_BOUND = "upper"
+
+# Values of positions already searched (stored once for all their symmetries), kept between moves and games
+transposition_table = {}
+
+# Optimal move (as a cell index) for every position the game can reach, keyed by canonical_key
+# and given for that canonical orientation of the board (filled on the first call to minimax)
+policy_table = {}
+
 
 def initial_state():
     """
@@ -23,19 +49,14 @@ def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    noughts, crosses = 0, 0
 
-    for row in board:
-        for cell in row:
-            if cell == "O":
-                noughts += 1
-            elif cell == "X":
-                crosses += 1
+    # X always moves first, so it's X's turn whenever an even number of moves have been made
+    moves_made = 9 - (board[0] + board[1] + board[2]).count(EMPTY)
 
-    if noughts == crosses:
-        return "X"
+    if moves_made & 1 == 0:
+        return X
     else:
-        return "O"
+        return O
 
 
 def actions(board):
@@ -43,14 +64,8 @@ def actions(board):
     Returns set of all possible actions (i, j) available on the board.
     """
 
-    possible_moves = set()
-
-    for row in range(3):
-        for cell in range(3):
-            if board[row][cell] == None:
-                possible_moves.add((row, cell))
-
-    return possible_moves
+    cells = board[0] + board[1] + board[2]
+    return {(i // 3, i % 3) for i in range(9) if cells[i] is EMPTY}
 
 
 def result(board, action):
@@ -58,18 +73,19 @@ def result(board, action):
     Returns the board that results from making move (i, j) on the board.
     """
 
-    test_board = copy.deepcopy(board)
+    # Copies each row (cells are immutable so they can be shared between boards)
+    test_board = [row[:] for row in board]
 
-    if test_board[action[0]][action[1]] in ["X", "O"]:
+    if test_board[action[0]][action[1]] is not EMPTY:
         raise Exception("Place is already taken!")
     elif action[0] < 0 or action[1] < 0:
         raise Exception("Negative value not allowed.")
 
-    if player(board) == "X":
-        test_board[action[0]][action[1]] = "X"
+    if player(board) is X:
+        test_board[action[0]][action[1]] = X
         return test_board
     else:
-        test_board[action[0]][action[1]] = "O"
+        test_board[action[0]][action[1]] = O
         return test_board
 
 
@@ -78,57 +94,7 @@ def winner(board):
     Returns the winner of the game, if there is one.
     """
 
-    left, centre, right = True, True, True
-    left_value, centre_value, right_value = None, None, None
-
-    for row in range(len(board)):
-        # Checks the rows for winners
-        if board[row][0] == "X" and board[row][1] == "X" and board[row][2] == "X":
-            return "X"
-        elif board[row][0] == "O" and board[row][1] == "O" and board[row][2] == "O":
-            return "O"
-
-        # Checks the columns for winners
-        if left == True:
-            if board[row][0] == None:
-                left = False
-            elif left_value == None or left_value == board[row][0]:
-                left_value = board[row][0]
-            else:
-                left = False
-        if centre == True:
-            if board[row][1] == None:
-                centre = False
-            elif centre_value == None or centre_value == board[row][1]:
-                centre_value = board[row][1]
-            else:
-                centre = False
-        if right == True:
-            if board[row][2] == None:
-                right = False
-            elif right_value == None or right_value == board[row][2]:
-                right_value = board[row][2]
-            else:
-                right = False
-
-    # Checks the diagonals for winners
-    if board[1][1] in ["X", "O"]:
-        central_value = board[1][1]
-
-        if board[0][0] == central_value and board[2][2] == central_value:
-            return central_value
-        elif board[0][2] == central_value and board[2][0] == central_value:
-            return central_value
-
-    # Returns a value if column checks return a winner
-    if left == True:
-        return left_value
-    elif centre == True:
-        return centre_value
-    elif right == True:
-        return right_value
-
-    return None
+    return bitboard_winner(*bitboards(board))
 
 
 def terminal(board):
@@ -136,13 +102,12 @@ def terminal(board):
     Returns True if game is over, False otherwise.
     """
 
-    if winner(board) in ["X", "O"]:
+    if winner(board) is not None:
         return True
     else:
         for row in board:
             for cell in row:
-                print(cell)
-                if cell == None:
+                if cell is EMPTY:
                     return False
 
     return True
@@ -154,83 +119,319 @@ def utility(board):
     """
 
     result = winner(board)
-    if result == "X":
+    if result is X:
         return 1
-    elif result == "O":
+    elif result is O:
         return -1
     else:
         return 0
 
 
-def optimal_value(board):
+def bitboards(board):
+    """
+    Returns the (x_mask, o_mask) bitboards of a board.
+    """
+
+    # Joins the rows into one flat list of cells, so cell i is (i // 3, i % 3)
+    x_mask, o_mask = 0, 0
+    for i, cell in enumerate(board[0] + board[1] + board[2]):
+        if cell is X:
+            x_mask |= 1 << i
+        elif cell is O:
+            o_mask |= 1 << i
+
+    return x_mask, o_mask
+
+
+def empty_cells(taken):
+    """
+    Yields the index of each cell not set in the `taken` bitboard, lowest first.
+    """
+
+    # Picks off the lowest empty cell's bit each time until none are left
+    empty = FULL_BOARD & ~taken
+    while empty:
+        yield (empty & -empty).bit_length() - 1
+        empty &= empty - 1
+
+
+@functools.lru_cache(maxsize=None)
+def bitboard_winner(x_mask, o_mask):
     """
-    Returns the optimal action value
+    Returns the winner of the game on a pair of bitboards, if there is one.
+    (Results are cached, as there are fewer than 3^9 possible boards.)
     """
 
-    # Finds which players turn it is and sets up a best move value which always improves
-    active_player = player(board)
-    if active_player == "X":
+    for pattern in WIN_PATTERNS:
+        if x_mask & pattern == pattern:
+            return X
+        elif o_mask & pattern == pattern:
+            return O
+
+    return None
+
+
+def evaluate(x_mask, o_mask):
+    """
+    Returns (True, utility) if the game on a pair of bitboards is over, where the utility is
+    1 if X has won, -1 if O has won and 0 otherwise; returns (False, None) if it isn't over.
+    """
+
+    result = bitboard_winner(x_mask, o_mask)
+    if result is X:
+        return True, 1
+    elif result is O:
+        return True, -1
+    elif (x_mask | o_mask) == FULL_BOARD:
+        return True, 0
+    else:
+        return False, None
+
+
+def symmetry_tables():
+    """
+    Returns a table for each of the board's 8 symmetries (rotations, with and without
+    reflection), mapping every bitboard to the bitboard it is transformed into.
+    """
+
+    tables = []
+    for reflect in (False, True):
+        for rotations in range(4):
+
+            # Finds which cell each cell is moved to under the symmetry
+            cell_map = []
+            for i in range(9):
+                row, column = i // 3, i % 3
+                if reflect:
+                    column = 2 - column
+                for _ in range(rotations):
+                    row, column = column, 2 - row
+                cell_map.append(row * 3 + column)
+
+            tables.append(tuple(
+                sum(1 << cell_map[i] for i in range(9) if mask & (1 << i))
+                for mask in range(FULL_BOARD + 1)
+            ))
+
+    return tuple(tables)
+
+
+SYMMETRY_TABLES = symmetry_tables()
+
+
+def canonical_key(x_mask, o_mask):
+    """
+    Returns the same key for every position which is a rotation or reflection of the
+    given bitboards (all of which have the same value).
+    """
+
+    return min((table[x_mask], table[o_mask]) for table in SYMMETRY_TABLES)
+
+
+def optimal_value(x_mask, o_mask, alpha=-2, beta=2, active_player=X, depth=9):
+    """
+    Returns the optimal action value of the board given by a pair of bitboards, only searching
+    for values between alpha and beta (the values X and O are already guaranteed elsewhere in
+    the game tree) and up to `depth` moves ahead (positions beyond that are valued 0)
+    """
+
+    # Values the position as undecided if the search can't look any further ahead
+    if depth == 0:
+        return 0
+
+    # Uses a previously searched value for the position if it was searched at least as deep and
+    # settles the search here
+    key = canonical_key(x_mask, o_mask)
+    if key in transposition_table and transposition_table[key][2] >= depth:
+        stored_value, stored_bound, _ = transposition_table[key]
+        if stored_bound == EXACT:
+            return stored_value
+        elif stored_bound == LOWER_BOUND:
+            alpha = max(alpha, stored_value)
+        else:
+            beta = min(beta, stored_value)
+        if alpha >= beta:
+            return stored_value
+    original_alpha, original_beta = alpha, beta
+
+    # Sets up a best move value which always improves for the player who's turn it is
+    if active_player is X:
         best_move_value = -2
+        next_player = O
     else:
         best_move_value = 2
+        next_player = X
 
-    # Iterates through possible actions to find the optimal one
-    for move in actions(board):
-        new_board = result(board, move)
+    # Iterates through the empty cells to find the optimal move
+    taken = x_mask | o_mask
+    for i in MOVE_ORDER:
+        move_bit = 1 << i
+        if taken & move_bit:
+            continue
 
-        # If the game hasn't ended recursion is used to find future moves values for optimal play
-        if terminal(new_board) == False:
-            move_value = optimal_value(new_board)
+        if active_player is X:
+            new_x_mask, new_o_mask = x_mask | move_bit, o_mask
         else:
-            move_value = utility(new_board)
+            new_x_mask, new_o_mask = x_mask, o_mask | move_bit
+
+        # If the game hasn't ended recursion is used to find future moves values for optimal play
+        game_over, move_value = evaluate(new_x_mask, new_o_mask)
+        if game_over == False:
+            move_value = optimal_value(new_x_mask, new_o_mask, alpha, beta, next_player, depth - 1)
 
         # Sets the best move value according to the player who's turn it is
-        if active_player == "X" and move_value > best_move_value:
+        if active_player is X and move_value > best_move_value:
             best_move_value = move_value
             if best_move_value == 1:
-                return 1
-        elif active_player == "O" and move_value < best_move_value:
+                break
+            alpha = max(alpha, best_move_value)
+        elif active_player is O and move_value < best_move_value:
             best_move_value = move_value
             if best_move_value == -1:
-                return -1
+                break
+            beta = min(beta, best_move_value)
+
+        # Stops searching once the other player has a better option elsewhere
+        if alpha >= beta:
+            break
+
+    # Keeps a value from a deeper search over this one, as it's more useful to later searches
+    if key in transposition_table and transposition_table[key][2] > depth:
+        return best_move_value
+
+    # Stores the value and search depth, noting whether pruning means it's only a bound on the true value
+    if best_move_value <= original_alpha:
+        transposition_table[key] = (best_move_value, UPPER_BOUND, depth)
+    elif best_move_value >= original_beta:
+        transposition_table[key] = (best_move_value, LOWER_BOUND, depth)
+    else:
+        transposition_table[key] = (best_move_value, EXACT, depth)
 
     return best_move_value
 
 
-
-def minimax(board):
+def best_move_search(x_mask, o_mask, active_player, depth, first_move=None):
     """
-    Returns the optimal action for the current player on the board.
+    Returns the best move (as a cell index) and its value for the player to move on a pair of
+    bitboards, searching up to `depth` moves ahead and trying `first_move` before the others.
     """
 
-    active_player = player(board)
     best_move = None
-    if active_player == "X":
+    alpha, beta = -2, 2
+    if active_player is X:
         best_move_value = -2
+        next_player = O
     else:
         best_move_value = 2
+        next_player = X
 
-    # Iterates through possible actions to find the optimal one
-    for move in actions(board):
-        new_board = result(board, move)
+    # Tries the best move from a shallower search first, as it's likely still the best
+    if first_move is None:
+        move_order = MOVE_ORDER
+    else:
+        move_order = (first_move,) + tuple(i for i in MOVE_ORDER if i != first_move)
 
-        # If the game hasn't ended recursion is used to find future moves values for optimal play
-        if terminal(new_board) == False:
-            move_value = optimal_value(new_board)
+    # Iterates through the empty cells to find the optimal move
+    taken = x_mask | o_mask
+    for i in move_order:
+        move_bit = 1 << i
+        if taken & move_bit:
+            continue
+
+        if active_player is X:
+            new_x_mask, new_o_mask = x_mask | move_bit, o_mask
         else:
-            move_value = utility(new_board)
-            return None
+            new_x_mask, new_o_mask = x_mask, o_mask | move_bit
+
+        # If the game hasn't ended recursion is used to find future moves values for optimal play
+        game_over, move_value = evaluate(new_x_mask, new_o_mask)
+        if game_over == False:
+            move_value = optimal_value(new_x_mask, new_o_mask, alpha, beta, next_player, depth - 1)
 
         # Sets the best move value according to the player who's turn it is
-        if active_player == "X" and move_value > best_move_value:
+        if active_player is X and move_value > best_move_value:
             best_move_value = move_value
-            best_move = move
+            best_move = i
             if best_move_value == 1:
-                return best_move
-        elif active_player == "O" and move_value < best_move_value:
+                break
+            alpha = max(alpha, best_move_value)
+        elif active_player is O and move_value < best_move_value:
             best_move_value = move_value
-            best_move = move
+            best_move = i
             if best_move_value == -1:
-                return best_move
+                break
+            beta = min(beta, best_move_value)
+
+    return best_move, best_move_value
+
+
+def deepening_search(x_mask, o_mask, active_player):
+    """
+    Returns the optimal move (as a cell index) for the player to move on a pair of bitboards.
+
+    Searches one move further ahead at a time, starting each search with the previous search's
+    best move.
+    """
+
+    moves_left = 9 - bin(x_mask | o_mask).count("1")
+    best_move = None
+
+    for depth in range(1, moves_left + 1):
+        best_move, best_move_value = best_move_search(x_mask, o_mask, active_player, depth, best_move)
+
+        # Stops once the game is decided, as searching further ahead can't change the outcome
+        if best_move_value != 0:
+            break
 
     return best_move
+
+
+def solve_policy(x_mask=0, o_mask=0, active_player=X):
+    """
+    Fills the policy table with the optimal move for every position reachable from the given
+    bitboards, searching each position only once for all of its symmetries.
+    """
+
+    key = canonical_key(x_mask, o_mask)
+    if key in policy_table or evaluate(x_mask, o_mask)[0]:
+        return
+
+    # Searches the canonical orientation of the board, so moves are stored relative to it
+    x_mask, o_mask = key
+    policy_table[key] = deepening_search(x_mask, o_mask, active_player)
+
+    # Every position after this one is a symmetry of a move made on the canonical board
+    for i in empty_cells(x_mask | o_mask):
+        move_bit = 1 << i
+        if active_player is X:
+            solve_policy(x_mask | move_bit, o_mask, O)
+        else:
+            solve_policy(x_mask, o_mask | move_bit, X)
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on the board.
+    """
+
+    x_mask, o_mask = bitboards(board)
+    if evaluate(x_mask, o_mask)[0]:
+        return None
+
+    # Solves every position in the game the first time a move is needed
+    if not policy_table:
+        solve_policy()
+
+    # Looks up the move for the canonical board, then maps it back onto this board's orientation
+    key = canonical_key(x_mask, o_mask)
+    move_bit = 1 << policy_table[key]
+    for table in SYMMETRY_TABLES:
+        if (table[x_mask], table[o_mask]) == key:
+            i = next(i for i in range(9) if table[1 << i] == move_bit)
+            return (i // 3, i % 3)
+
+
+# Solves the game from the empty board once when the module is loaded (a few milliseconds), so
+# the transposition table is already filled when the first move is searched (these full-depth
+# values are kept, as shallower searches never replace them)
+optimal_value(0, 0)
@@ -1,6 +1,13 @@
 import itertools
 import random
 
+# Row and column offsets of the 8 cells surrounding a cell
+NEIGHBOUR_OFFSETS = (
+    (-1, -1), (-1, 0), (-1, 1),
+    (0, -1), (0, 1),
+    (1, -1), (1, 0), (1, 1)
+)
+
 
 class Minesweeper():
     """
@@ -14,21 +21,14 @@ class Minesweeper():
         self.width = width
         self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        # Initialize an empty field with no mines, stored row-major
+        # with one byte per cell
+        self.board = bytearray(height * width)
 
         # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        for index in random.sample(range(height * width), mines):
+            self.board[index] = True
+            self.mines.add(divmod(index, width))
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -41,7 +41,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.board[i * self.width + j]:
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -50,7 +50,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i * self.width + j])
 
     def nearby_mines(self, cell):
         """
@@ -59,23 +59,17 @@ class Minesweeper():
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
+        i, j = cell
+        width = self.width
 
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+        # Sums the (clipped) 3x3 block one row slice at a time
+        left, right = max(0, j - 1), min(width, j + 2)
+        count = 0
+        for row in range(max(0, i - 1), min(self.height, i + 2)):
+            count += sum(self.board[row * width + left:row * width + right])
 
-        return count
+        # Ignore the cell itself
+        return count - self.board[i * width + j]
 
     def won(self):
         """
@@ -92,37 +86,36 @@ class Sentence():
     """
 
     def __init__(self, cells, count):
-        self.cells = set(cells)
+        # Cells are stored immutably and replaced, rather than changed, when marked
+        self.cells = frozenset(cells)
         self.count = count
 
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
 
     def __str__(self):
-        return f"{self.cells} = {self.count}"
+        return f"{set(self.cells)} = {self.count}"
 
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
         """
 
-        mines = set()
-
-        if len(self.cells) == self.count:
-            for cell in self.cells:
-                mines.add(cell)
-
-        return mines
+        # Returns the (shared, allocation-free) empty frozenset in the usual case where nothing is known
+        if len(self.cells) != 0 and len(self.cells) == self.count:
+            return self.cells
+        else:
+            return frozenset()
 
     def known_safes(self):
         """
         Returns the set of all cells in self.cells known to be safe.
         """
 
-        if self.count == 0:
+        if len(self.cells) != 0 and self.count == 0:
             return self.cells
         else:
-            return set()
+            return frozenset()
 
     def mark_mine(self, cell):
         """
@@ -132,7 +125,7 @@ class Sentence():
         
         if cell in self.cells:
             self.count -= 1
-            self.cells.remove(cell)
+            self.cells = self.cells - {cell}
 
     def mark_safe(self, cell):
         """
@@ -141,7 +134,7 @@ class Sentence():
         """
         
         if cell in self.cells:
-            self.cells.remove(cell)
+            self.cells = self.cells - {cell}
 
 class MinesweeperAI():
     """
@@ -161,17 +154,27 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
+        # Keep track of safe cells which haven't been clicked on yet
+        self.available_safes = set()
+
         # List of sentences about the game known to be true
         self.knowledge = []
 
+        # Keep track of every (cells, count) sentence the knowledge base has held
+        self.seen_sentences = set()
+
+        # Index of the sentences containing each (unmarked) cell
+        self.cell_sentences = {}
+
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        for sentence in self.cell_sentences.pop(cell, ()):
             sentence.mark_mine(cell)
+            self.seen_sentences.add((sentence.cells, sentence.count))
 
     def mark_safe(self, cell):
         """
@@ -179,71 +182,83 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        if cell not in self.moves_made:
+            self.available_safes.add(cell)
+        for sentence in self.cell_sentences.pop(cell, ()):
             sentence.mark_safe(cell)
+            self.seen_sentences.add((sentence.cells, sentence.count))
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base and indexes it by its cells.
+        """
+        self.knowledge.append(sentence)
+        self.seen_sentences.add((sentence.cells, sentence.count))
+        for cell in sentence.cells:
+            self.cell_sentences.setdefault(cell, []).append(sentence)
 
-    def check_knowledge(self):
+    def check_knowledge(self, sentences=None):
         """
-        Runs through knowledge sentences and compares them to see whether any new sentences can be deduced
+        Runs through knowledge sentences and compares them to see whether any new sentences can be deduced.
+        If `sentences` is None, every sentence in the knowledge base is checked. Otherwise, only `sentences`
+        (and any sentences changed or deduced along the way) are checked against the knowledge base.
         """
-        end_function = False
 
-        # Iterates sentances in the knowledge base to find definite mines and safes
-        for sentence in self.knowledge:
-            new_mines, new_safes = [], []
+        # Works through a list of sentences which are new or have changed since they were last checked
+        if sentences == None:
+            pending = list(self.knowledge)
+        else:
+            pending = list(sentences)
 
-            for found_mine in sentence.known_mines():
-                new_mines.append(found_mine)
-            for found_safe in sentence.known_safes():
-                new_safes.append(found_safe)
+        while len(pending) != 0:
+            sentence = pending.pop()
 
+            # Marks definite mines and safes, rechecking every sentence the marked cells are removed from
+            new_mines = sentence.known_mines()
+            new_safes = sentence.known_safes()
+            for new in itertools.chain(new_mines, new_safes):
+                pending.extend(self.cell_sentences.get(new, ()))
             for new in new_mines:
                 self.mark_mine(new)
             for new in new_safes:
                 self.mark_safe(new)
 
-        # Compares all sentences to each other to see whether subsets can exclude each other (restarts if new info is found)
-        sentence_no = len(self.knowledge)
-        for sen_1_index, sentence_1 in enumerate(self.knowledge[:-2]):
-            for sentence_2 in self.knowledge[(sen_1_index + 1):(sentence_no)]:
-                if len(sentence_1.cells) > len(sentence_2.cells):
-                    long_sentence, short_sentence = sentence_1, sentence_2
-                elif len(sentence_1.cells) < len(sentence_2.cells):
-                    long_sentence, short_sentence = sentence_2, sentence_1
+            if len(sentence.cells) == 0:
+                continue
+
+            # Compares the sentence to the others sharing a cell with it (only these can be subsets or
+            # supersets of it) to see whether subsets can exclude each other
+            others = {
+                id(other): other
+                for cell in sentence.cells
+                for other in self.cell_sentences[cell]
+            }
+            for other in others.values():
+                if other is sentence:
+                    continue
+                elif sentence.cells < other.cells:
+                    long_sentence, short_sentence = other, sentence
+                elif other.cells < sentence.cells:
+                    long_sentence, short_sentence = sentence, other
                 else:
                     continue
-                
-                subset = True
 
-                # Checks whether the shorter sentence is a subset of the larger
-                for cell in short_sentence.cells:
-                    if cell not in long_sentence.cells:
-                        subset = False
-                        break
+                new_set = long_sentence.cells - short_sentence.cells
+                new_count = long_sentence.count - short_sentence.count
 
-                if subset == False:
+                # If the sentence has already been known, it discards it
+                key = (new_set, new_count)
+                if key in self.seen_sentences:
                     continue
-                
-                new_set = long_sentence.cells - short_sentence.cells
 
-                # If the new set is already in a sentence, it discards it
-                already_present = False
-                for sentence in self.knowledge:
-                    if new_set == sentence.cells:
-                        already_present = True
-                        break
-                
-                # If a new sentence is found the knowledge base is appended and the check re-run
-                if already_present == False:
-                    new_sentence = Sentence(long_sentence.cells - short_sentence.cells, long_sentence.count - short_sentence.count)
-                    self.knowledge.append(new_sentence)
-                    self.check_knowledge()
-                    end_function = True
-                    break
-            
-            if end_function == True:
-                break
-    
+                # Otherwise the knowledge base is appended and the sentence queued for checking
+                new_sentence = Sentence(new_set, new_count)
+                self.add_sentence(new_sentence)
+                pending.append(new_sentence)
+
+        # Drops sentences which no longer contain any cells
+        self.knowledge = [sentence for sentence in self.knowledge if len(sentence.cells) != 0]
+
     def add_knowledge(self, cell, count):
         """
         Called when the Minesweeper board tells us, for a given
@@ -260,33 +275,31 @@ class MinesweeperAI():
                if they can be inferred from existing knowledge
         """
 
-        # Marks the known safe move as a being made and add to safe moves
+        # Marks the known safe move as a being made and add to safe moves (sentences containing it change)
         self.moves_made.add(cell)
+        self.available_safes.discard(cell)
+        changed = list(self.cell_sentences.get(cell, ()))
         self.mark_safe(cell)
 
         surrounding_cells = set()
 
-        # Iterates through 9 by 9 grid around the cell if within board bounds
-        for i in range(-1, 2, 1):
-            if (cell[0] + i) < self.width and (cell[0] + i) >= 0:
-                for j in range(-1, 2, 1):
-                    if (cell[1] + j) < self.height and (cell[1] + j) >= 0:
-
-                        new_cell = (cell[0] + i, cell[1] + j)
-
-                        # Excludes central cell
-                        if i == 0 and j == 0:
-                            pass
-                        # Doesn't count any cells which have already been accounted for
-                        elif new_cell not in self.moves_made:
-                            if new_cell in self.mines:
-                                count -= 1
-                            elif new_cell not in self.safes:
-                                surrounding_cells.add(new_cell)
+        # Iterates through the 8 cells surrounding the cell if within board bounds
+        row, column = cell
+        for i, j in NEIGHBOUR_OFFSETS:
+            new_row, new_column = row + i, column + j
+            if 0 <= new_row < self.height and 0 <= new_column < self.width:
+                new_cell = (new_row, new_column)
+
+                # Doesn't count any cells which have already been accounted for
+                if new_cell in self.mines:
+                    count -= 1
+                elif new_cell not in self.moves_made and new_cell not in self.safes:
+                    surrounding_cells.add(new_cell)
                 
-        # Adds the new sentence to the knowledge base before inferring more data
-        self.knowledge.append(Sentence(surrounding_cells, count))
-        self.check_knowledge()
+        # Adds the new sentence to the knowledge base before inferring more data from it and the changed sentences
+        new_sentence = Sentence(surrounding_cells, count)
+        self.add_sentence(new_sentence)
+        self.check_knowledge(changed + [new_sentence])
 
     def make_safe_move(self):
         """
@@ -297,12 +310,9 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        
-        for cell in self.safes:
-            if cell not in self.moves_made:
-                return cell
-            
-        return None
+
+        # Returns any safe cell not yet clicked on, or None if there aren't any
+        return next(iter(self.available_safes), None)
 
     def make_random_move(self):
         """
@@ -312,20 +322,23 @@ class MinesweeperAI():
             2) are not known to be mines
         """
 
-        # Creates a set of all possible cells
-        remaining = set()
-        for i in range(self.width):
-            for j in range(self.height):
-                remaining.add((i, j))
-
-        # Removes mined and taken cells from the total set
-        remaining = remaining - self.moves_made
-        remaining = remaining - self.mines
-
-        # Returns a random cell unless there are no possible moves (in which case AI wins!)
-        remaining_length = len(remaining)
-        if remaining_length == 0:
+        # Returns None if there are no possible moves (in which case AI wins!)
+        # Moves made are always safe, so no cell is counted twice
+        cell_no = self.height * self.width
+        excluded_no = len(self.moves_made) + len(self.mines)
+        if excluded_no >= cell_no:
             return None
-        else:
-            for random_cell in remaining:
-                return random_cell
+
+        # While most cells are still available, picks random cells until one is allowed
+        if excluded_no < cell_no / 2:
+            while True:
+                cell = (random.randrange(self.height), random.randrange(self.width))
+                if cell not in self.moves_made and cell not in self.mines:
+                    return cell
+
+        # Otherwise picks directly from the remaining cells
+        remaining = [
+            (i, j) for i in range(self.height) for j in range(self.width)
+            if (i, j) not in self.moves_made and (i, j) not in self.mines
+        ]
+        return random.choice(remaining)
@@ -1,3 +1,5 @@
+import bisect
+import itertools
 import os
 import random
 import re
@@ -6,6 +8,9 @@ import sys
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Matches the href of each anchor tag in raw (undecoded) HTML
+HREF_PATTERN = re.compile(rb"<a\b[^>]*?\shref=\"([^\"]*)\"", re.IGNORECASE)
+
 
 def main():
     if len(sys.argv) != 2:
@@ -33,10 +38,14 @@ def crawl(directory):
     for filename in os.listdir(directory):
         if not filename.endswith(".html"):
             continue
-        with open(os.path.join(directory, filename)) as f:
+        with open(os.path.join(directory, filename), "rb") as f:
             contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+        links = {
+            match.group(1).decode("utf-8", "replace")
+            for match in HREF_PATTERN.finditer(contents)
+        }
+        links.discard(filename)
+        pages[filename] = links
 
     # Only include links to other pages in the corpus
     for filename in pages:
@@ -58,16 +67,13 @@ def transition_model(corpus, page, damping_factor):
     a link at random chosen from all pages in the corpus.
     """
 
-    prob_dist = {}
-
     # Sets up the probability that any page is randomly selected from corpus
     page_links = corpus[page]
     if len(page_links) == 0:
         any_page_chance = 1 / len(corpus)
     else:
         any_page_chance = (1 - damping_factor) / len(corpus)
-    for page_name in corpus:
-        prob_dist[page_name] = any_page_chance
+    prob_dist = dict.fromkeys(corpus, any_page_chance)
 
     # Sets up probability that one of the links is selected
     if len(page_links) != 0:
@@ -88,39 +94,28 @@ def sample_pagerank(corpus, damping_factor, n):
     PageRank values should sum to 1.
     """
 
-    # Creates the pagerank dictionary using the corpus
-    pagerank = {}
-    for page_name in corpus:
-        pagerank[page_name] = 0
-
-    # Randomly selects a starting page before adding it to pagerank
-    start_index = random.randint(0, len(pagerank) - 1)
-    for index, page in enumerate(pagerank):
-        if index == start_index:
-            sample_page = page
-
-    pagerank[sample_page] += 1
-
-    # Using the initial starting page, runs through n iterations of sampling
+    # Builds each page's cumulative transition probabilities once, over a fixed page order
+    names = list(corpus)
+    cumulative = []
+    for page in names:
+        sample_dist = transition_model(corpus, page, damping_factor)
+        page_cumulative = list(itertools.accumulate(sample_dist[name] for name in names))
+        page_cumulative[-1] = 1  # Guards against rounding leaving the total below 1
+        cumulative.append(page_cumulative)
+
+    # Randomly selects a starting page before counting it
+    visits = [0] * len(names)
+    sample_index = random.randrange(len(names))
+    visits[sample_index] += 1
+
+    # Using the initial starting page, runs through n iterations of sampling, finding the
+    # first page whose cumulative probability reaches the random number
     for i in range(n - 1):
-        sample_dist = transition_model(corpus, sample_page, damping_factor)
-        random_no = random.random()
-
-        # Goes through probability distribution and adds probabilities until random number is exceeded
-        probability_total = 0
-        for page in sample_dist:
-            probability_total += sample_dist[page]
-            if probability_total >= random_no:
-                sample_page = page
-                break
-
-        pagerank[sample_page] += 1
+        sample_index = bisect.bisect_left(cumulative[sample_index], random.random())
+        visits[sample_index] += 1
 
     # Normalises the pagerank probabilities
-    for page in pagerank:
-        pagerank[page] = pagerank[page] / n
-
-    return pagerank
+    return {page: visits[i] / n for i, page in enumerate(names)}
 
 
 def iterate_pagerank(corpus, damping_factor):
@@ -133,44 +128,48 @@ def iterate_pagerank(corpus, damping_factor):
     PageRank values should sum to 1.
     """
 
+    # Indexes the pages and lists, for each page, the pages which link to it
+    names = list(corpus)
+    page_count = len(names)
+    page_index = {page: i for i, page in enumerate(names)}
+    out_degree = [len(corpus[page]) for page in names]
+    linked_from = [[] for _ in names]
+    for i, page in enumerate(names):
+        for link in corpus[page]:
+            linked_from[page_index[link]].append(i)
+    dangling = [i for i in range(page_count) if out_degree[i] == 0]
+
     # Initialises the pagerank values
-    pagerank = {}
-    initial_rank = 1 / len(corpus)
-    for page in corpus:
-        pagerank[page] = initial_rank
-        
-        if len(corpus[page]) == 0:
-            for add_link in corpus:
-                corpus[page].add(add_link)
+    pagerank = [1 / page_count] * page_count
+    pagerank_const = (1 - damping_factor) / page_count
 
     max_change = 1
-    pagerank_const = (1 - damping_factor) / len(corpus)
-
     while max_change > 0.001:
-        max_change = 0
-
-        # Iterates through all pages to change pagerank
-        for page_p in corpus:
-
-            # Finds pages which link to page p and finds probability of clicking p link
-            link_prob = 0
-            for page_i in corpus:
-                if page_p in corpus[page_i]:
-                    link_no = len(corpus[page_i])
-                    link_prob += pagerank[page_i] / link_no
 
+        # Finds the probability of following each page's links, with pages that have
+        # no links treated as linking to every page (including themselves)
+        link_share = [
+            pagerank[i] / out_degree[i] if out_degree[i] else 0
+            for i in range(page_count)
+        ]
+        dangling_share = sum(pagerank[i] for i in dangling) / page_count
+
+        # Finds the new pagerank probabilities from the pages which link to each page
+        new_pagerank = [
+            pagerank_const + damping_factor * (
+                dangling_share + sum(link_share[i] for i in linked_from[p])
+            )
+            for p in range(page_count)
+        ]
+
+        # Finds the largest difference between old and new ranks
+        max_change = max(
+            abs(new_rank - old_rank)
+            for new_rank, old_rank in zip(new_pagerank, pagerank)
+        )
+        pagerank = new_pagerank
 
-            # Finds the new pagerank probability
-            new_rank = pagerank_const + damping_factor * (link_prob)
-            
-            # Finds the difference between old and new rank
-            rank_change = abs(new_rank - pagerank[page_p])
-            if rank_change > max_change:
-                max_change = rank_change
-
-            pagerank[page_p] = new_rank
-
-    return pagerank
+    return {page: pagerank[i] for i, page in enumerate(names)}
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 import sys
+from collections import Counter, deque
 
 from crossword import *
 
@@ -10,11 +11,35 @@ class CrosswordCreator():
         Create new CSP crossword generate.
         """
         self.crossword = crossword
+
+        # Buckets the vocabulary by word length so each variable starts with only the
+        # words that fit it
+        words_by_length = {}
+        for word in self.crossword.words:
+            words_by_length.setdefault(len(word), set()).add(word)
+
         self.domains = {
-            var: self.crossword.words.copy()
+            var: words_by_length.get(var.length, set()).copy()
+            for var in self.crossword.variables
+        }
+
+        # Caches each variable's overlapping variables as they never change
+        self.neighbors = {
+            var: self.crossword.neighbors(var)
             for var in self.crossword.variables
         }
 
+        # Lists each overlapping pair once, under one of its variables, as (neighbour, i, j)
+        # where the variable's ith character overlaps the neighbour's jth character
+        self.overlap_checks = {var: [] for var in self.crossword.variables}
+        checked = set()
+        for var in self.crossword.variables:
+            checked.add(var)
+            for neighbour in self.neighbors[var]:
+                if neighbour not in checked:
+                    i, j = self.crossword.overlaps[var, neighbour]
+                    self.overlap_checks[var].append((neighbour, i, j))
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -101,14 +126,12 @@ class CrosswordCreator():
         """
 
         # Runs through variable domains and removes words which don't match the variable length
+        # (domains are already bucketed by length on creation, so this is normally a no-op)
         for var in self.domains:
-            remove_word = []
-            for word in self.domains[var]:
-                if len(word) != var.length:
-                    remove_word.append(word)
-
-            for word in remove_word:
-                self.domains[var].remove(word)
+            self.domains[var].difference_update([
+                word for word in self.domains[var]
+                if len(word) != var.length
+            ])
 
     def revise(self, x, y):
         """
@@ -124,24 +147,17 @@ class CrosswordCreator():
         if overlap == None:
             return False
         else:
-            changed = False
-
-            # Goes through words in the X var domain and checks whether there's a suitable match in the Y var domain
-            remove_list = []
-            for x_word in self.domains[x]:
-                arc_consistent = False
-                for y_word in self.domains[y]:
-                    if x_word[overlap[0]] == y_word[overlap[1]]:
-                        arc_consistent = True
-
-                if arc_consistent == False:
-                    changed = True
-                    remove_list.append(x_word)
+            # Collects the letters the Y var domain can place on the overlap in one pass
+            y_letters = {y_word[overlap[1]] for y_word in self.domains[y]}
 
-            for word in remove_list:
-                self.domains[x].remove(word)
+            # Removes words in the X var domain which have no suitable match in the Y var domain
+            remove_list = [
+                x_word for x_word in self.domains[x]
+                if x_word[overlap[0]] not in y_letters
+            ]
+            self.domains[x].difference_update(remove_list)
 
-            return changed
+            return len(remove_list) != 0
 
     def ac3(self, arcs=None):
         """
@@ -153,29 +169,35 @@ class CrosswordCreator():
         return False if one or more domains end up empty.
         """
 
-        # Populates a list with all arcs in the problem
-        arc_list = []
+        # Populates a queue with all arcs in the problem
+        arc_list = deque()
         if arcs == None:
             for x in self.domains:
-                neighbour = self.crossword.neighbors(x)
+                neighbour = self.neighbors[x]
                 for var in neighbour:
                     arc_list.append((x, var))
         else:
-            arc_list = arcs
+            arc_list.extend(arcs)
+
+        # Keeps track of the queued arcs so that none are queued twice
+        queued_arcs = set(arc_list)
 
         # Runs through arcs until all have been removed or a domain is empty
         while len(arc_list) != 0:
-            current_arc = arc_list.pop(0)
+            current_arc = arc_list.popleft()
+            queued_arcs.discard(current_arc)
 
-            # If a revision needs to be made for arc consistency, all of the nodes other
-            # neighbours must be double checked.
+            # If a revision needs to be made for arc consistency, the arcs from all of the
+            # node's other neighbours back to it must be double checked.
             if self.revise(current_arc[0], current_arc[1]) == True:
                 if len(self.domains[current_arc[0]]) == 0:
                     return False
                 else:
-                    for var in self.crossword.neighbors(current_arc[0]):
-                        if var != current_arc[1]:
-                            arc_list.insert(0, (current_arc[0], var))
+                    for var in self.neighbors[current_arc[0]]:
+                        new_arc = (var, current_arc[0])
+                        if var != current_arc[1] and new_arc not in queued_arcs:
+                            queued_arcs.add(new_arc)
+                            arc_list.append(new_arc)
 
         return True
 
@@ -185,16 +207,7 @@ class CrosswordCreator():
         crossword variable); return False otherwise.
         """
 
-        if len(assignment) == len(self.domains):
-            return True
-        else:
-            return False
-
-        for var in assignment:
-            if assignment[var] == None:
-                return False
-
-        return True
+        return len(assignment) == len(self.domains)
 
     def consistent(self, assignment):
         """
@@ -202,25 +215,19 @@ class CrosswordCreator():
         puzzle without conflicting characters); return False otherwise.
         """
 
-        used_words = []
+        # Ensures words are unique
+        if len(set(assignment.values())) != len(assignment):
+            return False
 
-        for var in assignment:
-            # Ensures word is unique
-            if assignment[var] in used_words:
-                return False
+        for var, word in assignment.items():
             # Ensures path length
-            elif var.length != len(assignment[var]):
+            if var.length != len(word):
                 return False
 
-            # Checks that the overlaps use the same character
-            neighbours = self.crossword.neighbors(var)
-            for neighbour in neighbours:
-                if neighbour in assignment:
-                    overlap = self.crossword.overlaps[var, neighbour]
-                    if assignment[var][overlap[0]] != assignment[neighbour][overlap[1]]:
-                        return False
-
-            used_words.append(assignment[var])
+            # Checks that the overlaps use the same character (each overlap is only checked once)
+            for neighbour, i, j in self.overlap_checks[var]:
+                if neighbour in assignment and word[i] != assignment[neighbour][j]:
+                    return False
 
         return True
 
@@ -238,25 +245,21 @@ class CrosswordCreator():
             unordered_domain[word] = 0
 
         # If a neighbour of var isn't yet in the assignment overlap is found and then conflicts found between domains
-        for neighbour in self.crossword.neighbors(var):
+        for neighbour in self.neighbors[var]:
             if neighbour not in assignment:
                 overlap = self.crossword.overlaps[var, neighbour]
 
-                # Iterates through words in the var's domain and compares the neighbouring overlap
+                # Counts the neighbour's words by overlapping letter, so each word in the var's domain
+                # rules out every neighbour word except those sharing its letter
+                letter_counts = Counter(
+                    neighbour_word[overlap[1]] for neighbour_word in self.domains[neighbour]
+                )
+                neighbour_size = len(self.domains[neighbour])
                 for word in unordered_domain:
-                    for neighbour_word in self.domains[neighbour]:
-                        if word[overlap[0]] != neighbour_word[overlap[1]]:
-                            unordered_domain[word] += 1
+                    unordered_domain[word] += neighbour_size - letter_counts[word[overlap[0]]]
 
-        ordered_domain = []
-
-        # Goes through the unordered domain, removing the least constraining word and adding it to the ordered list
-        while len(unordered_domain) != 0:
-            least_const = min(unordered_domain, key=unordered_domain.get)
-            unordered_domain.pop(least_const)
-            ordered_domain.append(least_const)
-
-        return ordered_domain
+        # Orders the domain from least to most constraining word
+        return sorted(unordered_domain, key=unordered_domain.get)
 
     def select_unassigned_variable(self, assignment):
         """
@@ -267,32 +270,11 @@ class CrosswordCreator():
         return values.
         """
 
-        # Puts all unassigned varibales into dictionary
-        unassigned_vars = {}
-        for var in self.domains:
-            if var not in assignment:
-                unassigned_vars[var] = len(self.domains[var])
-
-        var_options = {}
-
-        # Retrieves the minimum valued variables from the list
-        min_domains = -1
-        for i in range(len(unassigned_vars)):
-            min_var = min(unassigned_vars, key=unassigned_vars.get)
-            min_var_value = unassigned_vars[min_var]
-            unassigned_vars.pop(min_var)
-
-            # Ensures the variable value is the min and saves it to dictionary with neighbour no.
-            if min_domains == -1:
-                min_domains = min_var_value
-                var_options[min_var] = len(self.crossword.neighbors(min_var))
-            elif min_domains == min_var_value:
-                var_options[min_var] = len(self.crossword.neighbors(min_var))
-            else:
-                break
-
-        # Returns variable with most neighbours
-        return max(var_options, key=var_options.get)
+        # Returns the unassigned variable with the fewest remaining values, then the most neighbours
+        return min(
+            (var for var in self.domains if var not in assignment),
+            key=lambda var: (len(self.domains[var]), -len(self.neighbors[var]))
+        )
 
     def backtrack(self, assignment):
         """
@@ -309,13 +291,17 @@ class CrosswordCreator():
             return assignment
 
         var = self.select_unassigned_variable(assignment)
+        used_words = set(assignment.values())
 
         # Tries words in domain in order of least conflict
         for domain_word in self.order_domain_values(var, assignment):
+            if domain_word in used_words:
+                continue
             assignment[var] = domain_word
 
-            # Checks consistency of assigned word
-            if self.consistent(assignment) == False:
+            # Prunes the neighbours' domains, skipping the word if any would be left empty
+            removed = self.forward_check(var, assignment)
+            if removed == None:
                 assignment.pop(var)
                 continue
 
@@ -325,10 +311,59 @@ class CrosswordCreator():
             if try_backtrack != None:
                 return try_backtrack
 
+            self.restore_domains(removed)
             assignment.pop(var)
 
         return None
 
+    def forward_check(self, var, assignment):
+        """
+        Remove values from the domains of `var`'s unassigned neighbours which
+        conflict with the word assigned to `var` in `assignment`.
+
+        Return a list of (variable, removed words) pairs so that the removals
+        can be undone with `restore_domains`; return None, leaving all domains
+        unchanged, if the word conflicts with an assigned neighbour or any
+        neighbour's domain would end up empty.
+        """
+
+        word = assignment[var]
+        removed = []
+
+        for neighbour in self.neighbors[var]:
+            overlap = self.crossword.overlaps[var, neighbour]
+            letter = word[overlap[0]]
+
+            # Checks the word against neighbours which have already been assigned
+            if neighbour in assignment:
+                if assignment[neighbour][overlap[1]] != letter:
+                    self.restore_domains(removed)
+                    return None
+                continue
+
+            # Finds the neighbour's words which don't share the overlapping letter (or repeat the word)
+            conflicts = {
+                neighbour_word for neighbour_word in self.domains[neighbour]
+                if neighbour_word[overlap[1]] != letter or neighbour_word == word
+            }
+            if len(conflicts) == len(self.domains[neighbour]):
+                self.restore_domains(removed)
+                return None
+
+            if conflicts:
+                self.domains[neighbour] -= conflicts
+                removed.append((neighbour, conflicts))
+
+        return removed
+
+    def restore_domains(self, removed):
+        """
+        Undo the domain removals returned by `forward_check`.
+        """
+
+        for neighbour, words in removed:
+            self.domains[neighbour] |= words
+
 
 def main():
 
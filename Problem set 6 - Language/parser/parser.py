@@ -1,4 +1,5 @@
 import nltk
+import re
 import sys
 
 TERMINALS = """
@@ -21,6 +22,9 @@ NP -> N | Det N | NP P NP | Det AP N | NP Adv
 AP -> Adj | Adj AP
 """
 
+# Finds the first ASCII letter in a word
+HAS_ASCII_LETTER = re.compile(r"[A-Za-z]").search
+
 grammar = nltk.CFG.fromstring(NONTERMINALS + TERMINALS)
 parser = nltk.ChartParser(grammar)
 
@@ -66,16 +70,12 @@ def preprocess(sentence):
     character.
     """
 
-    word_list = []
-
-    # Converts string to tokens and adds each token with at least one letter to the word list
-    for word in nltk.tokenize.word_tokenize(sentence.lower()):
-        for letter in word:
-            if letter.isalpha():
-                word_list.append(word)
-                break
-
-    return word_list
+    # Converts string to tokens and keeps each token with at least one letter (only checking
+    # characters one at a time, with str.isalpha, for tokens that aren't plain ASCII)
+    return [
+        word for word in nltk.tokenize.word_tokenize(sentence.lower())
+        if HAS_ASCII_LETTER(word) or (not word.isascii() and any(c.isalpha() for c in word))
+    ]
 
 
 def np_chunk(tree):
@@ -88,20 +88,24 @@ def np_chunk(tree):
 
     noun_phrase_chunks = []
 
-    # Checks subtrees within the tree to ensure that they don't contain any NPs
-    for subtree in tree.subtrees():
-        if subtree.label() == "NP":
-            lowest_level_NP = True
+    def contains_noun_phrase(node):
+        """
+        Walks the subtrees of `node` once, adding each NP without any NPs below it to the
+        chunks, and returns whether any subtree below `node` is an NP
+        """
+
+        has_noun_phrase = False
+        for child in node:
+            if isinstance(child, nltk.Tree):
+                if contains_noun_phrase(child) or child.label() == "NP":
+                    has_noun_phrase = True
+
+        if node.label() == "NP" and not has_noun_phrase:
+            noun_phrase_chunks.append(node)
 
-            first_item = True
-            for contained_groups in subtree.subtrees():
-                if contained_groups.label() == "NP" and first_item == False:
-                    lowest_level_NP = False
-                    break
-                first_item = False
+        return has_noun_phrase
 
-            if lowest_level_NP:
-                noun_phrase_chunks.append(subtree)
+    contains_noun_phrase(tree)
 
     return noun_phrase_chunks
 